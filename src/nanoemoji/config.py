@@ -19,6 +19,7 @@ try:
 except ImportError:
     import importlib_resources as resources  # pytype: disable=import-error
 
+from collections import Counter
 import itertools
 from pathlib import Path
 from picosvg.svg_transform import Affine2D
@@ -389,7 +390,9 @@ def load(
                 srcs.update(_resolve_src(config_dir, src))
         if additional_srcs is not None:
             srcs.update(additional_srcs)
-        srcs = tuple(sorted(util.abspath(p) for p in srcs))
+        # normalize before deduplicating so the same file reached by different
+        # paths (e.g. relative on the CLI, absolute in config) only counts once
+        srcs = tuple(sorted({util.abspath(p) for p in srcs}))
 
         master = MasterConfig(
             master_name,
@@ -409,9 +412,14 @@ def load(
 
         masters.append(master)
 
-        master_source_names = {s.name for s in master.sources}
-        if len(master_source_names) != len(master.sources):
-            raise ValueError(f"Input svgs for {master_name} must have unique names")
+        source_name_counts = Counter(s.name for s in master.sources)
+        duplicate_names = sorted(n for n, c in source_name_counts.items() if c > 1)
+        if duplicate_names:
+            raise ValueError(
+                f"Input svgs for {master_name} must have unique names, "
+                f"duplicates: {', '.join(duplicate_names)}"
+            )
+        master_source_names = set(source_name_counts)
         if not source_names:
             source_names = master_source_names
         elif source_names != master_source_names:
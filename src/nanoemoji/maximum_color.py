@@ -30,6 +30,7 @@ from absl import flags
 from absl import logging
 from fontTools import ttLib
 from fontTools.ttLib.ttFont import newTable
+import io
 from nanoemoji import config
 from nanoemoji.colr_to_svg import colr_glyphs
 from nanoemoji.extract_svgs import svg_glyphs
@@ -167,17 +168,20 @@ def bitmap_dest(input_svg: Path) -> Path:
 
 
 def _write_preamble(nw: NinjaWriter):
+    # The svg extract/generate tools write one file per glyph into --output_dir.
+    # Their $out lists every such file so leave it off the command line, where
+    # for big fonts it makes for a huge command (and isn't used anyway).
     module_rule(
         nw,
         "extract_svgs_from_otsvg",
-        f"--output_dir {rel_build(svg_extract_dir())} $in $out",
+        f"--output_dir {rel_build(svg_extract_dir())} $in",
     )
     nw.newline()
 
     module_rule(
         nw,
         "generate_svgs_from_colr",
-        f"--output_dir {rel_build(svg_generate_dir())} $in $out",
+        f"--output_dir {rel_build(svg_generate_dir())} $in",
     )
     nw.newline()
 
@@ -478,8 +482,9 @@ def _run(argv):
 
     if gen_ninja():
         logging.info(f"Generating {build_file.relative_to(build_dir())}")
-        with open(build_file, "w") as f:
-            nw = NinjaWriter(f)
+        # accumulate in memory, one write at the end rather than many small ones
+        with io.StringIO() as buf:
+            nw = NinjaWriter(buf)
             _write_preamble(nw)
 
             wip_file = _keep_glyph_names(nw, input_file)
@@ -502,6 +507,8 @@ def _run(argv):
             else:
                 _strip_glyph_names(nw, wip_file, final_output)
 
+            build_file.write_text(buf.getvalue())
+
     maybe_run_ninja(build_file)
 
 
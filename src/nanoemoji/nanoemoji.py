@@ -33,7 +33,9 @@ from absl import logging
 from collections.abc import Iterable
 import functools
 import glob
-from nanoemoji import codepoints, config, write_font
+import hashlib
+import io
+from nanoemoji import __version__, codepoints, config, write_font
 from nanoemoji.config import AxisPosition, FontConfig, MasterConfig
 from nanoemoji.ninja import (
     build_dir,
@@ -75,8 +77,12 @@ flags.DEFINE_bool(
 flags.DEFINE_integer("svg_font_diff_resolution", 256, "Render diffs resolution")
 
 
+# where we live doesn't change, resolve it once rather than per call
+_SELF_DIR = Path(__file__).parent.resolve()
+
+
 def self_dir() -> Path:
-    return Path(__file__).parent.resolve()
+    return _SELF_DIR
 
 
 def rel_self(path: Path) -> Path:
@@ -160,20 +166,14 @@ def _chrome_command() -> str:
 
 def write_preamble(nw):
     nw.rule(
-        f"picosvg_unclipped",
-        f"picosvg "
-        + _bool_flag("clip_to_viewbox", False)
-        + " --output_file $out"
-        + " $in",
+        "picosvg_unclipped",
+        f"picosvg{_bool_flag('clip_to_viewbox', False)} --output_file $out $in",
     )
     nw.newline()
 
     nw.rule(
-        f"picosvg_clipped",
-        f"picosvg "
-        + _bool_flag("clip_to_viewbox", True)
-        + " --output_file $out"
-        + " $in",
+        "picosvg_clipped",
+        f"picosvg{_bool_flag('clip_to_viewbox', True)} --output_file $out $in",
     )
     nw.newline()
 
@@ -299,19 +299,27 @@ def diff_bitmap_dir() -> Path:
 def _dest_for_src(scope_fn, out_dir: Path, input_svg: Path, suffix: str) -> Path:
     if not hasattr(scope_fn, "names_seen"):
         scope_fn.names_seen = {}
+        scope_fn.dests_seen = {}
     names_seen = scope_fn.names_seen
+    dests_seen = scope_fn.dests_seen
+
+    # The same input is asked about repeatedly (config, glyphmap, builds, ...)
+    input_svg = abspath(input_svg)
+    dest = dests_seen.get((out_dir, input_svg))
+    if dest is not None:
+        return dest
 
     # If  many different inputs have the same name disambiguate 1..N
     # by including N in picosvg path
-    input_svg = abspath(input_svg)
-    nth_of_name = 0
-    while names_seen.get((nth_of_name, input_svg.name), input_svg) != input_svg:
-        nth_of_name += 1
-    names_seen[(nth_of_name, input_svg.name)] = input_svg
+    inputs_with_name = names_seen.setdefault(input_svg.name, {})
+    nth_of_name = inputs_with_name.setdefault(input_svg, len(inputs_with_name))
 
+    dest_dir = out_dir
     if nth_of_name > 0:
-        out_dir = out_dir / str(nth_of_name)
-    return rel_build(out_dir / input_svg.name).with_suffix(suffix)
+        dest_dir = dest_dir / str(nth_of_name)
+    dest = rel_build(dest_dir / (input_svg.stem + suffix))
+    dests_seen[(out_dir, input_svg)] = dest
+    return dest
 
 
 def picosvg_dest(clipped: bool, input_svg: Path) -> Path:
@@ -400,7 +408,6 @@ def write_bitmap_builds(
     resolution: int,
     master: MasterConfig,
 ):
-    os.makedirs(str(bitmap_dir()), exist_ok=True)
     for svg_file in master.sources:
         dest = bitmap_dest(svg_file)
         if dest in bitmap_builds:
@@ -416,7 +423,6 @@ def write_compressed_bitmap_builds(
     nw: NinjaWriter,
     master: MasterConfig,
     rule_name: str,
-    dest_dir: Path,
     infile_fn: Callable[[Path], Path],
     outfile_fn: Callable[[Path], Path],
     variables: Optional[Mapping[str, Any]] = None,
@@ -424,7 +430,6 @@ def write_compressed_bitmap_builds(
     if variables is None:
         variables = {}
 
-    os.makedirs(str(dest_dir), exist_ok=True)
     for svg_file in master.sources:
         dest = outfile_fn(svg_file)
         if dest in builds:
@@ -442,53 +447,59 @@ def write_fea_build(nw: NinjaWriter, font_config: FontConfig):
     nw.newline()
 
 
-def write_svg_font_diff_build(
-    nw: NinjaWriter, font_dest: str, svg_files: Sequence[Path], resolution: int
-):
-    # render each svg => png
-    for svg_file in svg_files:
-        nw.build(
-            svg2png_dest(svg_file),
-            "screenshot",
+class SvgFontDiffDests(NamedTuple):
+    svg: Path
+    svg2png: Path
+    font2png_html: Path
+    font2png: Path
+    diff_png: Path
+
+    @classmethod
+    def for_svg(cls, svg_file: Path) -> "SvgFontDiffDests":
+        return cls(
             rel_build(svg_file),
-            variables={"res": resolution},
+            svg2png_dest(svg_file),
+            font2png_html_dest(svg_file),
+            font2png_dest(svg_file),
+            diff_png_dest(svg_file),
         )
-    nw.newline()
 
+
+def write_svg_font_diff_build(
+    nw: NinjaWriter,
+    font_dest: str,
+    svg_dests: Sequence[SvgFontDiffDests],
+    resolution: int,
+):
     # copy the output font to the screenshot directory
     font_for_screenshots = font2png_dir() / "Font.ttf"
     nw.build(font_for_screenshots, "copy_font_to_screenshot_dir", font_dest)
+    nw.newline()
 
-    # make an html container for each input in the font
-    for svg_file in svg_files:
-        inputs = [
-            font_for_screenshots,
-            rel_build(svg_file),
-        ]
+    for dests in svg_dests:
+        # render the svg => png
         nw.build(
-            font2png_html_dest(svg_file),
-            "write_font2png_html",
-            inputs,
+            dests.svg2png,
+            "screenshot",
+            dests.svg,
             variables={"res": resolution},
         )
-    nw.newline()
 
-    # render the html container => png
-    for svg_file in svg_files:
-        nw.build(font2png_dest(svg_file), "screenshot", font2png_html_dest(svg_file))
-    nw.newline()
+        # make an html container for the svg in the font, render it => png
+        nw.build(
+            dests.font2png_html,
+            "write_font2png_html",
+            [font_for_screenshots, dests.svg],
+            variables={"res": resolution},
+        )
+        nw.build(dests.font2png, "screenshot", dests.font2png_html)
 
-    # create comparison images
-    for svg_file in svg_files:
-        inputs = [
-            svg2png_dest(svg_file),
-            font2png_dest(svg_file),
-        ]
-        nw.build(diff_png_dest(svg_file), "write_pngdiff", inputs)
+        # create comparison image
+        nw.build(dests.diff_png, "write_pngdiff", [dests.svg2png, dests.font2png])
     nw.newline()
 
     # write report and kerplode if there are bad diffs
-    nw.build("diffs.html", "write_diffreport", [diff_png_dest(f) for f in svg_files])
+    nw.build("diffs.html", "write_diffreport", [d.diff_png for d in svg_dests])
 
 
 def _input_files(font_config: FontConfig, master: MasterConfig) -> List[Path]:
@@ -552,10 +563,7 @@ def _variables_for_font_build(
 
 
 def write_ufo_build(nw: NinjaWriter, font_config: FontConfig, master: MasterConfig):
-    ufo_config = font_config._replace(output_file=master.output_ufo, masters=(master,))
-    ufo_config = _update_sources(ufo_config)
     ufo_config_file = _ufo_config(font_config, master)
-    config.write(build_dir() / ufo_config_file, ufo_config)
     variables = _variables_for_font_build(font_config, master, ufo_config_file)
     variables["config_file"] = rel_build(ufo_config_file)
     nw.build(
@@ -601,6 +609,170 @@ def _write_config_for_build(font_config: FontConfig):
     logging.info(f"Wrote {config_file.relative_to(build_dir().parent)}")
 
 
+def _write_ufo_config_for_build(font_config: FontConfig, master: MasterConfig):
+    # Like _write_config_for_build, for the single master config used to build
+    # each master ufo of a variable font
+    ufo_config = font_config._replace(output_file=master.output_ufo, masters=(master,))
+    ufo_config = _update_sources(ufo_config)
+    ufo_config_file = _ufo_config(font_config, master)
+    config.write(ufo_config_file, ufo_config)
+    logging.info(f"Wrote {ufo_config_file.relative_to(build_dir().parent)}")
+
+
+def _ninja_fingerprint(font_configs: Sequence[FontConfig]) -> str:
+    # Everything build.ninja is generated from: the resolved configs (sources
+    # included), flags, the interpreter rules invoke and nanoemoji itself.
+    # Changes to the *content* of inputs are ninja's business, not ours.
+    newest_source = max(
+        (p.stat().st_mtime_ns for p in self_dir().glob("*.py")), default=0
+    )
+    fingerprint = hashlib.blake2b(digest_size=16)
+    for part in (
+        __version__,
+        str(newest_source),
+        sys.executable,
+        FLAGS.flags_into_string(),
+        repr(font_configs),
+    ):
+        fingerprint.update(part.encode("utf-8"))
+        fingerprint.update(b"\0")
+    return fingerprint.hexdigest()
+
+
+def _fingerprint_comment(fingerprint: str) -> str:
+    return f"nanoemoji fingerprint {fingerprint}"
+
+
+def _build_ninja_is_current(build_file: Path, fingerprint: str) -> bool:
+    # The fingerprint lives in build.ninja itself so a build.ninja written by
+    # someone else (e.g. maximum_color, same build_dir) never looks current
+    if not build_file.is_file():
+        return False
+    with open(build_file) as f:
+        header = [f.readline().rstrip("\n") for _ in range(3)]
+    return "# " + _fingerprint_comment(fingerprint) in header
+
+
+def _write_build_ninja(
+    build_file: Path, font_configs: Sequence[FontConfig], fingerprint: str
+):
+    # accumulate in memory, one write at the end rather than many small ones
+    with io.StringIO() as buf:
+        nw = NinjaWriter(buf)
+        nw.comment(_fingerprint_comment(fingerprint))
+        nw.newline()
+        write_preamble(nw)
+
+        for glyphmap_generator in sorted(
+            {fc.glyphmap_generator for fc in font_configs}
+        ):
+            write_glyphmap_rule(nw, glyphmap_generator)
+
+        # After rules, builds
+
+        for font_config in font_configs:
+            write_fea_build(nw, font_config)
+
+        for font_config in font_configs:
+            for master in font_config.masters:
+                write_glyphmap_build(nw, font_config, master)
+
+        picosvg_builds = set()  # svgs for which we already made a picosvg
+        part_files = set()
+        for font_config in font_configs:
+            for master in font_config.masters:
+                if font_config.has_picosvgs:
+                    _, parts = write_picosvg_builds(
+                        picosvg_builds,
+                        nw,
+                        font_config,
+                        master,
+                    )
+                    part_files |= parts
+        nw.newline()
+
+        # Write a combined part file (potentially empty)
+        nw.build(
+            master_part_file_dest(),
+            "write_combined_part_files",
+            sorted(part_files),
+        )
+
+        bitmap_builds = set()  # svgs for which we already made a bitmap
+        for font_config in font_configs:
+            if font_config.has_bitmaps:
+                assert not font_config.is_vf
+                write_bitmap_builds(
+                    bitmap_builds,
+                    nw,
+                    font_config.clip_to_viewbox,  # currently unused
+                    font_config.bitmap_resolution,
+                    font_config.masters[0],
+                )
+        nw.newline()
+
+        zopflipng_builds = set()  # svgs for which we already made a zopflipng
+        pngquant_builds = set()  # svgs for which we already made a pngquant
+        for font_config in font_configs:
+            if not font_config.has_bitmaps or not (
+                font_config.use_zopflipng or font_config.use_pngquant
+            ):
+                continue
+            assert not font_config.is_vf
+
+            master = font_config.masters[0]
+            if font_config.use_pngquant:
+                write_compressed_bitmap_builds(
+                    pngquant_builds,
+                    nw,
+                    master,
+                    rule_name="pngquant",
+                    infile_fn=bitmap_dest,
+                    outfile_fn=pngquant_dest,
+                    variables={"pngquant_flags": font_config.pngquant_flags},
+                )
+
+            if font_config.use_zopflipng:
+                zopflipng_infile_fn = bitmap_dest
+                if font_config.use_pngquant:
+                    zopflipng_infile_fn = pngquant_dest
+                    nw.newline()
+                write_compressed_bitmap_builds(
+                    zopflipng_builds,
+                    nw,
+                    master,
+                    rule_name="zopflipng",
+                    infile_fn=zopflipng_infile_fn,
+                    outfile_fn=zopflipng_dest,
+                )
+        nw.newline()
+
+        for font_config in font_configs:
+            if FLAGS.gen_svg_font_diffs:
+                assert not font_config.is_vf
+                write_svg_font_diff_build(
+                    nw,
+                    font_config.output_file,
+                    [
+                        SvgFontDiffDests.for_svg(f)
+                        for f in font_config.masters[0].sources
+                    ],
+                    font_config.bitmap_resolution,
+                )
+
+            for master in font_config.masters:
+                if font_config.is_vf:
+                    write_ufo_build(nw, font_config, master)
+
+        for font_config in font_configs:
+            if font_config.is_vf:
+                write_variable_font_build(nw, font_config)
+            else:
+                write_static_font_build(nw, font_config)
+
+        build_file.write_text(buf.getvalue())
+
+
 def _run(argv):
     additional_srcs = tuple(Path(f) for f in argv if f.endswith(".svg"))
     font_configs = config.load_configs(
@@ -616,15 +788,24 @@ def _run(argv):
             "Try `pip install resvg-cli` or visit https://github.com/RazrFalcon/resvg."
         )
 
-    required_dirs = [build_dir()]
+    # Collect every directory the build writes to and create each just once
+    required_dirs = {build_dir()}
     if FLAGS.gen_svg_font_diffs:
-        required_dirs += [
+        required_dirs |= {
             svg2png_dir(),
             font2png_dir(),
             diff_bitmap_dir(),
             picosvg_dir(),
-        ]
-    for required_dir in required_dirs:
+        }
+    for font_config in font_configs:
+        if not font_config.has_bitmaps:
+            continue
+        required_dirs.add(bitmap_dir())
+        if font_config.use_pngquant:
+            required_dirs.add(pngquant_dir())
+        if font_config.use_zopflipng:
+            required_dirs.add(zopflipng_dir())
+    for required_dir in sorted(required_dirs):
         required_dir.mkdir(parents=True, exist_ok=True)
     build_file = build_dir() / "build.ninja"
 
@@ -639,118 +820,17 @@ def _run(argv):
 
     for font_config in font_configs:
         _write_config_for_build(font_config)
+        if font_config.is_vf:
+            for master in font_config.masters:
+                _write_ufo_config_for_build(font_config, master)
 
     if gen_ninja():
-        logging.info(f"Generating {build_file.relative_to(build_dir())}")
-        with open(build_file, "w") as f:
-            nw = NinjaWriter(f)
-            write_preamble(nw)
-
-            for glyphmap_generator in sorted(
-                {fc.glyphmap_generator for fc in font_configs}
-            ):
-                write_glyphmap_rule(nw, glyphmap_generator)
-
-            # After rules, builds
-
-            for font_config in font_configs:
-                write_fea_build(nw, font_config)
-
-            for font_config in font_configs:
-                for master in font_config.masters:
-                    write_glyphmap_build(nw, font_config, master)
-
-            picosvg_builds = set()  # svgs for which we already made a picosvg
-            part_files = set()
-            for font_config in font_configs:
-                for master in font_config.masters:
-                    if font_config.has_picosvgs:
-                        _, parts = write_picosvg_builds(
-                            picosvg_builds,
-                            nw,
-                            font_config,
-                            master,
-                        )
-                        part_files |= parts
-            nw.newline()
-
-            # Write a combined part file (potentially empty)
-            nw.build(
-                master_part_file_dest(),
-                "write_combined_part_files",
-                sorted(part_files),
-            )
-
-            bitmap_builds = set()  # svgs for which we already made a bitmap
-            for font_config in font_configs:
-                if font_config.has_bitmaps:
-                    assert not font_config.is_vf
-                    write_bitmap_builds(
-                        bitmap_builds,
-                        nw,
-                        font_config.clip_to_viewbox,  # currently unused
-                        font_config.bitmap_resolution,
-                        font_config.masters[0],
-                    )
-            nw.newline()
-
-            zopflipng_builds = set()  # svgs for which we already made a zopflipng
-            pngquant_builds = set()  # svgs for which we already made a pngquant
-            for font_config in font_configs:
-                if not font_config.has_bitmaps or not (
-                    font_config.use_zopflipng or font_config.use_pngquant
-                ):
-                    continue
-                assert not font_config.is_vf
-
-                master = font_config.masters[0]
-                if font_config.use_pngquant:
-                    write_compressed_bitmap_builds(
-                        pngquant_builds,
-                        nw,
-                        master,
-                        rule_name="pngquant",
-                        dest_dir=pngquant_dir(),
-                        infile_fn=bitmap_dest,
-                        outfile_fn=pngquant_dest,
-                        variables={"pngquant_flags": font_config.pngquant_flags},
-                    )
-
-                if font_config.use_zopflipng:
-                    zopflipng_infile_fn = bitmap_dest
-                    if font_config.use_pngquant:
-                        zopflipng_infile_fn = pngquant_dest
-                        nw.newline()
-                    write_compressed_bitmap_builds(
-                        zopflipng_builds,
-                        nw,
-                        master,
-                        rule_name="zopflipng",
-                        dest_dir=zopflipng_dir(),
-                        infile_fn=zopflipng_infile_fn,
-                        outfile_fn=zopflipng_dest,
-                    )
-            nw.newline()
-
-            for font_config in font_configs:
-                if FLAGS.gen_svg_font_diffs:
-                    assert not font_config.is_vf
-                    write_svg_font_diff_build(
-                        nw,
-                        font_config.output_file,
-                        font_config.masters[0].sources,
-                        font_config.bitmap_resolution,
-                    )
-
-                for master in font_config.masters:
-                    if font_config.is_vf:
-                        write_ufo_build(nw, font_config, master)
-
-            for font_config in font_configs:
-                if font_config.is_vf:
-                    write_variable_font_build(nw, font_config)
-                else:
-                    write_static_font_build(nw, font_config)
+        fingerprint = _ninja_fingerprint(font_configs)
+        if _build_ninja_is_current(build_file, fingerprint):
+            logging.info(f"{build_file.relative_to(build_dir())} is up to date")
+        else:
+            logging.info(f"Generating {build_file.relative_to(build_dir())}")
+            _write_build_ninja(build_file, font_configs, fingerprint)
 
     maybe_run_ninja(build_file)
 
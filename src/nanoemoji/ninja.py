@@ -17,6 +17,7 @@
 
 from absl import flags
 from absl import logging
+import functools
 from nanoemoji.util import rel, quote_if_path
 from ninja import ninja_syntax
 import os
@@ -85,12 +86,37 @@ class NinjaWriter:
         self._nw.comment(comment)
 
 
+@functools.lru_cache()
+def _resolve_build_dir(build_dir_flag: str) -> Path:
+    return Path(build_dir_flag).resolve()
+
+
 def build_dir() -> Path:
-    return Path(FLAGS.build_dir).resolve()
+    # called for nearly every path we write, don't resolve (stat) each time
+    return _resolve_build_dir(FLAGS.build_dir)
+
+
+@functools.lru_cache()
+def _build_dir_prefix(build_dir_flag: str) -> str:
+    return os.path.join(str(_resolve_build_dir(build_dir_flag)), "")
+
+
+# Each source is referenced by several rules (picosvg, bitmap, glyphmap, diffs, ...)
+# so remember the answer rather than recompute it per rule. Relative paths are
+# relative to the current directory, which we never change mid-run.
+@functools.lru_cache(maxsize=None)
+def _rel_build(build_dir_flag: str, path: Path) -> Path:
+    # Most destinations live inside build_dir; for those a prefix check spares us
+    # the component by component walk of os.path.relpath
+    prefix = _build_dir_prefix(build_dir_flag)
+    abs_path = os.path.abspath(path)
+    if abs_path.startswith(prefix):
+        return Path(abs_path[len(prefix) :])
+    return rel(_resolve_build_dir(build_dir_flag), path)
 
 
 def rel_build(path: Path) -> Path:
-    return rel(build_dir(), path)
+    return _rel_build(FLAGS.build_dir, path)
 
 
 def gen_ninja() -> bool:
@@ -119,9 +145,23 @@ def module_rule(
 
 
 def maybe_run_ninja(build_file: Path):
+    """Run ninja on build_file, if --exec_ninja.
+
+    Meant to be the last thing a tool does: on POSIX ninja replaces the current
+    process, rather than being forked and waited on, so this does not return.
+    """
     ninja_cmd = ["ninja", "-C", os.path.dirname(build_file)]
     if FLAGS.exec_ninja:
         logging.info(" ".join(ninja_cmd))
-        subprocess.run(ninja_cmd, check=True)
+        if os.name == "posix":
+            # exec skips Python's exit handling, don't lose buffered output
+            logging.flush()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.execvp(ninja_cmd[0], ninja_cmd)
+        else:
+            # Windows exec* spawns a new process and exits immediately, so the
+            # caller would not see ninja's exit status
+            subprocess.run(ninja_cmd, check=True)
     else:
         logging.info("To run: " + " ".join(ninja_cmd))
@@ -59,8 +59,11 @@ def expand_ninja_response_files(argv: List[str]) -> List[str]:
     return result
 
 
+_FS_ROOT = Path("/").resolve()
+
+
 def fs_root() -> Path:
-    return Path("/").resolve()
+    return _FS_ROOT
 
 
 def rel(from_path: Path, to_path: Path) -> Path:
@@ -84,3 +84,27 @@ def test_read_write_config(config_file):
 )
 def test_resolve_src(relative_base, src, expected_files):
     assert set(config._resolve_src(relative_base, str(src))) == expected_files
+
+
+def test_duplicate_src_names_are_reported():
+    tmp_dir = Path(tempfile.mkdtemp())
+    svg = locate_test_file("minimal_static/svg/61.svg")
+    for subdir in ("a", "b"):
+        (tmp_dir / subdir).mkdir()
+        shutil.copy(svg, tmp_dir / subdir / svg.name)
+
+    with pytest.raises(ValueError, match="duplicates: 61.svg"):
+        config.load(
+            additional_srcs=(tmp_dir / "a" / "61.svg", tmp_dir / "b" / "61.svg")
+        )
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def test_same_src_by_different_paths_is_deduplicated():
+    svg = locate_test_file("minimal_static/svg/61.svg")
+    via_parent = svg.parent / ".." / svg.parent.name / svg.name
+
+    font_config = config.load(additional_srcs=(svg, via_parent))
+
+    assert font_config.default().sources == (svg,)
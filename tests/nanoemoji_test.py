@@ -431,3 +431,42 @@ def test_build_output_file_with_spaces(font_type):
     assert output_file.is_file()
 
     assert "COLR" in TTFont(output_file)
+
+
+def test_build_ninja_only_regenerated_when_inputs_change():
+    svg = locate_test_file("minimal_static/svg/61.svg")
+    tmp_dir = run_nanoemoji((svg,))
+    build_file = tmp_dir / "build.ninja"
+    first_mtime = build_file.stat().st_mtime_ns
+
+    run_nanoemoji((svg,), tmp_dir=tmp_dir)
+    assert build_file.stat().st_mtime_ns == first_mtime
+
+    run_nanoemoji((svg, "--family", "Something Else"), tmp_dir=tmp_dir)
+    assert build_file.stat().st_mtime_ns != first_mtime
+
+
+def test_build_ninja_regenerated_when_replaced():
+    svg = locate_test_file("minimal_static/svg/61.svg")
+    tmp_dir = run_nanoemoji((svg,))
+    build_file = tmp_dir / "build.ninja"
+
+    # e.g. maximum_color writes build.ninja to the same default build_dir
+    foreign_build = "# Not written by nanoemoji\n\nbuild Font.ttf: phony\n"
+    build_file.write_text(foreign_build)
+
+    run_nanoemoji((svg,), tmp_dir=tmp_dir)
+    assert build_file.read_text() != foreign_build
+    assert "write_font" in build_file.read_text()
+
+
+def test_ufo_configs_rewritten_when_build_ninja_is_current():
+    config_file = locate_test_file("minimal_vf/config.toml")
+    tmp_dir = run_nanoemoji((config_file,))
+    ufo_configs = sorted(tmp_dir.glob("*.ufo.toml"))
+    assert len(ufo_configs) == 2
+
+    ufo_configs[0].unlink()
+    run_nanoemoji((config_file,), tmp_dir=tmp_dir)
+
+    assert sorted(tmp_dir.glob("*.ufo.toml")) == ufo_configs
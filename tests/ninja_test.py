@@ -0,0 +1,52 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from absl import flags
+from nanoemoji.ninja import build_dir, rel_build
+from nanoemoji.util import rel
+import os
+from pathlib import Path
+import pytest
+from test_helper import mkdtemp
+
+
+FLAGS = flags.FLAGS
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "picosvg/clipped/emoji_u42.svg",
+        "imagediff/../bitmap/emoji_u42.png",
+        ".",
+        "..",
+        "../sibling/emoji_u42.svg",
+        "../build_but_not_really/emoji_u42.svg",
+    ],
+)
+def test_rel_build(monkeypatch, path):
+    monkeypatch.setattr(FLAGS, "build_dir", str(mkdtemp() / "build"))
+    path = build_dir() / path
+
+    assert rel_build(path) == rel(build_dir(), path)
+    assert rel_build(path) == Path(os.path.relpath(path, build_dir()))
+
+
+def test_build_dir_follows_flag(monkeypatch):
+    monkeypatch.setattr(FLAGS, "build_dir", str(mkdtemp() / "one"))
+    one = build_dir()
+    monkeypatch.setattr(FLAGS, "build_dir", str(mkdtemp() / "two"))
+
+    assert build_dir() != one
+    assert build_dir().name == "two"